@@ -4,40 +4,216 @@
 # Beschreibung: RESTful API zur Verwaltung von Gruppen mit SQLite-Datenbank
 
 
-from flask import Flask, request, jsonify, send_from_directory, redirect
+from flask import Flask, Response, g, request
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import delete, event, select
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import atexit
+import click
+import functools
 import os
+import queue
 from werkzeug.security import check_password_hash, generate_password_hash
 from flask_cors import CORS
+from flask_caching import Cache
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+import orjson
 import hashlib
 import hmac
-import base64
+import secrets
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from collections import OrderedDict
 
 # Flask-App initialisieren
 app = Flask(__name__)
 
 # CORS vollständig konfigurieren
+CORS_ORIGINS = frozenset({'http://127.0.0.1:5500', 'http://localhost:5500', 'http://localhost:3000'})
+CORS_METHODS = ['GET', 'POST', 'DELETE', 'OPTIONS']
+CORS_HEADERS = ['Content-Type', 'Authorization']
+CORS_MAX_AGE = 86400  # Browser dürfen Preflight-Antworten einen Tag cachen
+
+# Einzige Stelle, an der CORS-Header für normale Antworten gesetzt werden
 CORS(app, 
-     origins=['http://127.0.0.1:5500', 'http://localhost:5500', 'http://localhost:3000'],
-     methods=['GET', 'POST', 'DELETE', 'OPTIONS'],
-     allow_headers=['Content-Type', 'Authorization'])
+     resources={r"/*": {"origins": sorted(CORS_ORIGINS)}},
+     methods=CORS_METHODS,
+     allow_headers=CORS_HEADERS,
+     max_age=CORS_MAX_AGE,
+     send_wildcard=False)
+
+# Vorberechnete Preflight-Header pro erlaubtem Origin
+_cors_preflight_headers = {
+    origin: {
+        'Access-Control-Allow-Origin': origin,
+        'Access-Control-Allow-Methods': ', '.join(CORS_METHODS),
+        'Access-Control-Allow-Headers': ', '.join(CORS_HEADERS),
+        'Access-Control-Max-Age': str(CORS_MAX_AGE),
+        'Vary': 'Origin',
+    }
+    for origin in CORS_ORIGINS
+}
+
+@app.before_request
+def _skip_options():
+    """Beantwortet Preflight-Requests direkt, ohne Routing und View-Aufruf."""
+    if request.method == 'OPTIONS':
+        return '', 204, _cors_preflight_headers.get(request.headers.get('Origin'), {})
 
 
+def _json(obj, status=200):
+    """
+    Serialisiert obj mit orjson (schneller als jsonify) und liefert eine JSON-Response.
+    Bereits serialisierte bytes (z.B. die _ERR_*-Konstanten) werden direkt verwendet.
+    """
+    body = obj if isinstance(obj, bytes) else orjson.dumps(obj)
+    return Response(body, status=status, mimetype='application/json')
+
+# Feste Fehlerantworten einmalig beim Import serialisieren. Die Response wird pro Request
+# neu erzeugt, da CORS und Limiter Header an der Response-Instanz ergänzen.
+_ERR_RATE_LIMIT = orjson.dumps({'success': False, 'message': 'Zu viele Anmeldeversuche, bitte später erneut versuchen'})
+_ERR_BAD_JSON = orjson.dumps({'success': False, 'message': 'JSON-Daten erforderlich'})
+_ERR_MISSING_CREDENTIALS = orjson.dumps({'success': False, 'message': 'Benutzername und Passwort erforderlich'})
+_ERR_BUSY = orjson.dumps({'success': False, 'message': 'Server ausgelastet, bitte erneut versuchen'})
+_ERR_INVALID_CREDENTIALS = orjson.dumps({'success': False, 'message': 'Ungültige Anmeldedaten'})
+_ERR_INTERNAL = orjson.dumps({'success': False, 'message': 'Interner Serverfehler'})
+_ERR_LOAD_GROUPS = orjson.dumps({'success': False, 'message': 'Fehler beim Laden der Gruppen'})
+_ERR_NAME_REQUIRED = orjson.dumps({'success': False, 'message': 'Name ist erforderlich'})
+_ERR_INVALID_ART = orjson.dumps({'success': False, 'message': 'Art muss 1 (Studenten) oder 2 (Auszubildende) sein'})
+_ERR_ADD_GROUP = orjson.dumps({'success': False, 'message': 'Fehler beim Hinzufügen'})
+_ERR_GROUPS_REQUIRED = orjson.dumps({'success': False, 'message': 'Liste "groups" ist erforderlich'})
+_ERR_GROUP_NOT_FOUND = orjson.dumps({'success': False, 'message': 'Gruppe nicht gefunden'})
+_ERR_DELETE_GROUP = orjson.dumps({'success': False, 'message': 'Fehler beim Löschen der Gruppe'})
+_ERR_UNAUTHORIZED = orjson.dumps({'success': False, 'message': 'Anmeldung erforderlich'})
 
 # Datenbank-Konfiguration: SQLite-Datenbank im instances-Ordner
 basedir = os.path.abspath(os.path.dirname(__file__))
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(basedir, "instances", "Gruppen.db")}'
+# Verbindungspool: Verbindungen werden wiederverwendet statt pro Request neu geöffnet
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_pre_ping': True,
+    'connect_args': {'check_same_thread': False, 'timeout': 30},
+}
 db = SQLAlchemy(app)
 
-# Logging-Konfiguration: Schreibt API-Aktivitäten in eine Log-Datei
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename='api_debug.log',
-    filemode='a'
+# SQLite-Tuning pro neuer Verbindung: WAL erlaubt parallele Leser während eines Schreibvorgangs
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-64000',  # ca. 64 MB Seiten-Cache
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',  # 256 MB Memory-Mapped I/O
 )
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+with app.app_context():
+    event.listen(db.engine, 'connect', _set_sqlite_pragmas)
+
+# Antwort-Cache für lesende Endpunkte; für mehrere Worker CACHE_TYPE=RedisCache setzen
+cache = Cache(app, config={
+    'CACHE_TYPE': os.environ.get('CACHE_TYPE', 'SimpleCache'),
+    'CACHE_REDIS_URL': os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0'),
+    'CACHE_DEFAULT_TIMEOUT': 60,
+})
+GROUPS_CACHE_KEY = 'groups_all'
+
+def _cache_only_success(response):
+    """Nur erfolgreiche Antworten (Status 200) cachen, Fehlerantworten nicht."""
+    return getattr(response, 'status_code', None) == 200
+
+# Rate-Limiting: begrenzt teure Passwortprüfungen pro Client; für mehrere Worker
+# RATELIMIT_STORAGE_URI auf Redis setzen (z.B. redis://localhost:6379/1)
+limiter = Limiter(
+    get_remote_address,
+    app=app,
+    default_limits=[],
+    storage_uri=os.environ.get('RATELIMIT_STORAGE_URI', 'memory://'),
+)
+LOGIN_RATE_LIMIT = '5/minute;30/hour'  # pro IP und Benutzername
+LOGIN_RATE_LIMIT_PER_IP = '20/minute'  # pro IP über alle Benutzernamen
+
+def _login_rate_key():
+    # Gültiges JSON kann auch eine Liste oder ein Skalar sein
+    data = request.get_json(silent=True)
+    username = data.get('username', '') if isinstance(data, dict) else ''
+    return f"{get_remote_address()}:{username}"
+
+@app.errorhandler(429)
+def ratelimit_exceeded(error):
+    logger.warning(f"Rate-Limit überschritten: {get_remote_address()} ({error.description})")
+    return _json(_ERR_RATE_LIMIT, 429)
+
+# Logging-Konfiguration: Schreibt API-Aktivitäten in eine Log-Datei
+# Log-Einträge landen in einer Queue und werden von einem Hintergrund-Thread
+# in die rotierende Datei geschrieben, damit Requests nicht auf Datei-I/O warten
+_log_queue = queue.Queue(-1)
+_log_file_handler = RotatingFileHandler('api_debug.log', maxBytes=10_000_000, backupCount=5, encoding='utf-8')
+_log_file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_listener = QueueListener(_log_queue, _log_file_handler)
+
+_root_logger = logging.getLogger()
+_root_logger.setLevel(logging.INFO)
+_root_logger.addHandler(QueueHandler(_log_queue))
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logger = logging.getLogger('family_api')
+# Einmal vorberechnet: f-Strings für INFO-Meldungen nur bauen, wenn INFO aktiv ist
+_LOG_INFO = logger.isEnabledFor(logging.INFO)
+
+# Platzhalter (Salt und 64 Hex-Zeichen Digest) für gleichen PBKDF2-Aufwand bei fehlerhaften Hashes
+_DUMMY_SALT = 'dummy-salt'
+_DUMMY_DIGEST = '0' * 64
+
+# LRU-Cache für PBKDF2-Ableitungen: Schlüssel ist ein prozesslokaler MAC des
+# Passworts (blake2b), damit keine Klartext-Passwörter im Speicher gehalten werden
+_KDF_CACHE_SIZE = 1024
+_KDF_CACHE_SECRET = secrets.token_bytes(32)
+_kdf_cache = OrderedDict()
+_kdf_cache_lock = threading.Lock()
+
+def _pbkdf2(algo, password, salt, iterations):
+    """
+    Berechnet PBKDF2-HMAC und merkt sich das Ergebnis pro (Algorithmus, Passwort, Salt, Iterationen).
+    password und salt werden als bytes erwartet.
+    """
+    password_mac = hashlib.blake2b(password, key=_KDF_CACHE_SECRET, digest_size=16).digest()
+    cache_key = (algo, password_mac, salt, iterations)
+
+    with _kdf_cache_lock:
+        key = _kdf_cache.get(cache_key)
+        if key is not None:
+            _kdf_cache.move_to_end(cache_key)
+            return key
+
+    key = hashlib.pbkdf2_hmac(algo, password, salt, iterations)
+
+    with _kdf_cache_lock:
+        _kdf_cache[cache_key] = key
+        if len(_kdf_cache) > _KDF_CACHE_SIZE:
+            _kdf_cache.popitem(last=False)
+    return key
+
+def clear_kdf_cache(signum=None, frame=None):
+    """Leert den PBKDF2-Cache (auch als SIGHUP-Handler nutzbar)."""
+    with _kdf_cache_lock:
+        _kdf_cache.clear()
+    logger.info("PBKDF2-Cache geleert")
+
+# Legacy-Django-Hashes: Iterationszahl ist nicht im Hash gespeichert und bleibt daher fix.
+# Nach erfolgreicher Anmeldung werden sie auf Werkzeug-scrypt migriert.
+DJANGO_ITERATIONS = 10000  # Django default zum Zeitpunkt der Erstellung
+_DJANGO_ALGORITHMS = {'1': 'sha1', '2': 'sha256'}  # PBKDF2 mit SHA1 / SHA256
 
 def check_django_password(password, encoded):
     """
@@ -46,34 +222,122 @@ def check_django_password(password, encoded):
     """
     try:
         parts = encoded.split('$')
-        if len(parts) != 3:
-            return False
-            
-        algorithm, salt, hash_value = parts
-        
-        if algorithm == '1':  # PBKDF2 mit SHA1
-            iterations = 10000  # Django default
-            key = hashlib.pbkdf2_hmac('sha1', password.encode('utf-8'), salt.encode('utf-8'), iterations)
-            computed_hash = key.hex()  # Als Hex-String statt base64
-            return computed_hash == hash_value
-            
-        elif algorithm == '2':  # PBKDF2 mit SHA256
-            iterations = 10000
-            key = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), iterations)
-            computed_hash = key.hex()
-            return computed_hash == hash_value
-            
+        well_formed = len(parts) == 3 and parts[0] in _DJANGO_ALGORITHMS
+        if well_formed:
+            algorithm, salt, hash_value = parts
+            digest_name = _DJANGO_ALGORITHMS[algorithm]
         else:
-            return False
+            # Fehlerhaftes Format oder unbekannter Algorithmus: gleiche PBKDF2-Arbeit mit
+            # Platzhalterwerten, das Ergebnis wird verworfen (kein Format-Orakel)
+            digest_name, salt, hash_value = 'sha256', _DUMMY_SALT, _DUMMY_DIGEST
+            
+        # Passwort und Salt nur einmal kodieren; hashlib nutzt OpenSSL (inkl. SHA-Extensions)
+        key = _pbkdf2(digest_name, password.encode('utf-8'), salt.encode('utf-8'), DJANGO_ITERATIONS)
+        computed_hash = key.hex()  # Als Hex-String statt base64
+        return hmac.compare_digest(computed_hash, hash_value) and well_formed
             
     except Exception as e:
         return False
 
+# Einheitliches Hash-Verfahren für alle gespeicherten Passwörter
+PASSWORD_HASH_METHOD = 'scrypt:32768:8:1'
+
+def migrate_password_hash(user, password):
+    """
+    Ersetzt einen Legacy-Hash durch einen Werkzeug-scrypt-Hash.
+    Das Hashing läuft über den KDF-Pool (Warteschlangen-Limit und Timeout), der
+    Datenbank-Schreibvorgang im Request-Thread. Fehler werden nur geloggt, damit die
+    Anmeldung selbst nicht scheitert; die Migration folgt dann beim nächsten Login.
+    """
+    try:
+        new_hash = _run_kdf(generate_password_hash, password, PASSWORD_HASH_METHOD)
+    except KdfBusyError:
+        logger.warning(f"Passwort-Migration verschoben (ausgelastet): {user.benutzer}")
+        return
+    except Exception as e:
+        logger.error(f"Fehler bei Passwort-Migration für {user.benutzer}: {e}")
+        return
+
+    try:
+        user.Passwort = new_hash
+        db.session.commit()
+        if _LOG_INFO:
+            logger.info(f"Passwort-Hash migriert: {user.benutzer}")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Fehler bei Passwort-Migration für {user.benutzer}: {e}")
+
+def _check_django_scheme(stored, password):
+    return check_django_password(password, stored)
+
+def _check_unknown_scheme(stored, password):
+    # Kein bekanntes Hash-Format (z.B. Klartext): immer ablehnen, aber mit gleichem Hash-Aufwand
+    check_password_hash(_DUMMY_PASSWORD_HASH, password)
+    return False
+
+# Dispatch-Tabelle: erstes Zeichen des gespeicherten Passworts -> (Verfahren, Prüffunktion)
+# Werkzeug: 'pbkdf2:', 'scrypt:' / Django: '1$', '2$' (nur noch zur Migration).
+# Alles andere (Klartext, argon2, Django '3$'/'4$') läuft über _UNKNOWN_SCHEME mit Dummy-Hash,
+# damit die Antwortzeit nichts über das gespeicherte Format verrät.
+_SCHEMES = {
+    'p': ('werkzeug', check_password_hash),
+    's': ('werkzeug', check_password_hash),
+    '1': ('django', _check_django_scheme),
+    '2': ('django', _check_django_scheme),
+}
+_UNKNOWN_SCHEME = ('unknown', _check_unknown_scheme)
+_PASSWORD_HASH_PREFIXES = ('pbkdf2:', 'scrypt:', 'argon2:', '1$', '2$', '3$', '4$')
+
+def _is_password_hash(stored):
+    """Erkennt Werkzeug- und Django-Hashes (Format: prefix...$salt$hash)."""
+    return stored.startswith(_PASSWORD_HASH_PREFIXES) and stored.count('$') == 2
+
+def _select_scheme(stored):
+    """Liefert (Verfahren, Prüffunktion); nur erkannte Hashes werden über _SCHEMES geprüft."""
+    if not _is_password_hash(stored):
+        return _UNKNOWN_SCHEME
+    return _SCHEMES.get(stored[:1], _UNKNOWN_SCHEME)
+
+# Thread-Pool für Passwort-Hashing: hashlib/scrypt geben den GIL frei, die Anzahl
+# gleichzeitiger KDF-Berechnungen ist auf die CPU-Kerne begrenzt
+KDF_TIMEOUT = 2  # Sekunden
+KDF_WORKERS = os.cpu_count() or 1
+KDF_MAX_PENDING = 4 * KDF_WORKERS  # laufende + wartende Jobs, darüber wird sofort abgelehnt
+_kdf_pool = ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix='kdf')
+_kdf_slots = threading.BoundedSemaphore(KDF_MAX_PENDING)
+
+class KdfBusyError(Exception):
+    """Passwortprüfung abgelehnt: Warteschlange voll oder Timeout überschritten."""
+
+def _run_kdf(fn, *args):
+    """
+    Führt eine Passwortprüfung im KDF-Pool aus und wartet höchstens KDF_TIMEOUT Sekunden.
+    Bei voller Warteschlange oder Timeout wird KdfBusyError ausgelöst; ein noch wartender
+    Job wird dabei abgebrochen, damit er keine CPU mehr verbraucht.
+    """
+    if not _kdf_slots.acquire(blocking=False):
+        raise KdfBusyError('KDF-Warteschlange voll')
+    try:
+        future = _kdf_pool.submit(fn, *args)
+    except Exception:
+        _kdf_slots.release()
+        raise
+    # Slot wird frei, sobald der Job fertig oder abgebrochen ist
+    future.add_done_callback(lambda _: _kdf_slots.release())
+    try:
+        return future.result(timeout=KDF_TIMEOUT)
+    except FutureTimeoutError:
+        future.cancel()
+        raise KdfBusyError('KDF-Timeout')
+
+# Vergleichs-Hash für unbekannte Benutzer (verhindert User-Enumeration über die Antwortzeit)
+_DUMMY_PASSWORD_HASH = generate_password_hash(secrets.token_urlsafe(16), method=PASSWORD_HASH_METHOD)
+
 class User(db.Model):
     __tablename__ = 'Login'  # Tabellenname in der Datenbank
     id = db.Column(db.Integer, primary_key=True)
-    benutzer = db.Column(db.String(80), unique=True, nullable=False)
-    Passwort = db.Column(db.String(120), nullable=False)
+    benutzer = db.Column(db.String(80), unique=True, nullable=False)  # UNIQUE-Autoindex bedient die Login-Suche
+    Passwort = db.Column(db.String(255), nullable=False)  # scrypt-Hashes sind länger als 120 Zeichen
     
     def __repr__(self):
         return f'<User {self.benutzer}>'
@@ -89,24 +353,95 @@ class Group(db.Model):
     name = db.Column(db.String(100), nullable=False)  # Gruppenname (max. 100 Zeichen)
     art = db.Column(db.Integer, nullable=False)    # Art der Gruppe (z.B. "studenten", "auszubildende")
 
+    # Abdeckender Index für get_groups (ORDER BY art, name): SQLite liest nur den Index
+    __table_args__ = (db.Index('ix_gruppen_art_name', 'art', 'name'),)
+
+def ensure_indexes():
+    """
+    Legt fehlende Indizes auf den bestehenden Tabellen an (ohne Tabellen neu zu erstellen)
+    und aktualisiert anschließend die SQLite-Statistiken.
+    """
+    with app.app_context():
+        for table in (User.__table__, Group.__table__):
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql('PRAGMA optimize')
+
+# CLI-Befehl: flask --app api ensure-indexes (einmalig nach Deployment, z.B. vor flask run/WSGI)
+@app.cli.command('ensure-indexes')
+def ensure_indexes_command():
+    """Legt fehlende Indizes an und aktualisiert die SQLite-Statistiken."""
+    ensure_indexes()
+    click.echo("Indizes geprüft und angelegt")
+
+# Sitzungs-Tokens: Nach dem Login prüfen weitere Requests nur noch einen HMAC statt des
+# Passwort-Hashes. Für mehrere Worker API_TOKEN_SECRET setzen und CACHE_TYPE=RedisCache nutzen.
+TOKEN_TTL = 900  # Sekunden, wird bei jeder Nutzung verlängert
+TOKEN_SECRET = os.environ.get('API_TOKEN_SECRET', '').encode('utf-8') or secrets.token_bytes(32)
+SESSION_CAPACITY = 100_000  # maximale Anzahl gleichzeitig gültiger Tokens
+
+# Eigener Speicher für Sitzungen, getrennt vom Antwort-Cache: dessen Verdrängung
+# (SimpleCache-Threshold) darf keine aktiven Benutzer abmelden.
+# Für mehrere Worker SESSION_CACHE_TYPE=RedisCache und SESSION_CACHE_REDIS_URL setzen.
+session_store = Cache(app, config={
+    'CACHE_TYPE': os.environ.get('SESSION_CACHE_TYPE', 'SimpleCache'),
+    'CACHE_REDIS_URL': os.environ.get('SESSION_CACHE_REDIS_URL', 'redis://localhost:6379/2'),
+    'CACHE_KEY_PREFIX': 'session:',
+    'CACHE_THRESHOLD': SESSION_CAPACITY,
+    'CACHE_DEFAULT_TIMEOUT': TOKEN_TTL,
+})
+
+def _sign_token(token):
+    return hmac.new(TOKEN_SECRET, token.encode('utf-8'), hashlib.sha256).hexdigest()
+
+def issue_token(username):
+    """Erzeugt ein Token für den Benutzer, legt es im Sitzungsspeicher ab und liefert (token, mac)."""
+    token = secrets.token_urlsafe(32)
+    session_store.set(f'user:{token}', username, timeout=TOKEN_TTL)
+    return token, _sign_token(token)
+
+def requires_auth(view):
+    """
+    Erwartet den Header 'Authorization: Bearer <token>.<mac>'.
+    Der MAC wird in konstanter Zeit geprüft, der Benutzer steht danach in g.user.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+        token, _, mac = credentials.partition('.')
+        if scheme != 'Bearer' or not token:
+            return _json(_ERR_UNAUTHORIZED, 401)
+        if not hmac.compare_digest(_sign_token(token).encode('utf-8'), mac.encode('utf-8')):
+            return _json(_ERR_UNAUTHORIZED, 401)
+
+        username = session_store.get(f'user:{token}')
+        if username is None:
+            return _json(_ERR_UNAUTHORIZED, 401)
+
+        # Gleitender Ablauf: aktive Sitzungen bleiben gültig
+        session_store.set(f'user:{token}', username, timeout=TOKEN_TTL)
+        g.user = username
+        return view(*args, **kwargs)
+    return wrapper
+
 # Login-Endpunkt
-@app.route('/api/login', methods=['POST', 'OPTIONS'])
+@app.route('/api/login', methods=['POST'])
+@limiter.limit(LOGIN_RATE_LIMIT, key_func=_login_rate_key)
+@limiter.limit(LOGIN_RATE_LIMIT_PER_IP)
 def login():
-    if request.method == 'OPTIONS':
-        return '', 200
-        
     try:
         data = request.get_json()
-        if not data:
+        if not data or not isinstance(data, dict):
             logger.error("Keine JSON-Daten empfangen")
-            return jsonify({'success': False, 'message': 'JSON-Daten erforderlich'}), 400
+            return _json(_ERR_BAD_JSON, 400)
             
         username = data.get('username')
         password = data.get('password')
         
         if not username or not password:
             logger.error("Username oder Password fehlt")
-            return jsonify({'success': False, 'message': 'Benutzername und Passwort erforderlich'}), 400
+            return _json(_ERR_MISSING_CREDENTIALS, 400)
         
         # Benutzer aus der Datenbank prüfen
         try:
@@ -114,76 +449,70 @@ def login():
             user = User.query.filter_by(benutzer=username).first()
             
             if user:
-                # Teste ob es ein gültiger Werkzeug-Hash ist
-                if user.Passwort.startswith(('pbkdf2:', 'scrypt:', 'argon2:')):
-                    try:
-                        password_valid = check_password_hash(user.Passwort, password)
-                        if password_valid:
-                            logger.info(f"Erfolgreiche Anmeldung: {username}")
-                            return jsonify({'success': True, 'message': 'Anmeldung erfolgreich'})
-                    except Exception as hash_error:
-                        pass
-                
-                # Teste ob es ein Django-Hash ist (beginnt mit Ziffer$)
-                elif user.Passwort.startswith(('1$', '2$', '3$', '4$')):
-                    try:
-                        # Django PBKDF2 Hash-Vergleich
-                        django_valid = check_django_password(password, user.Passwort)
-                        if django_valid:
-                            logger.info(f"Erfolgreiche Anmeldung: {username}")
-                            return jsonify({'success': True, 'message': 'Anmeldung erfolgreich'})
-                    except Exception as django_error:
-                        pass
-                
-                else:
-                    # Klartext-Vergleich
-                    if user.Passwort == password:
-                        logger.info(f"Erfolgreiche Anmeldung: {username}")
-                        return jsonify({'success': True, 'message': 'Anmeldung erfolgreich'})
+                # Hash-Verfahren einmalig bestimmen
+                kind, verifier = _select_scheme(user.Passwort)
+                stored = user.Passwort
             else:
-                pass
+                # Unbekannter Benutzer: gleicher Hash-Aufwand und gleiche Fehlerbehandlung
+                # wie bei existierendem Benutzer
+                kind, verifier, stored = 'dummy', check_password_hash, _DUMMY_PASSWORD_HASH
+            
+            try:
+                password_valid = _run_kdf(verifier, stored, password)
+            except KdfBusyError:
+                logger.warning(f"Passwortprüfung abgelehnt (ausgelastet/Timeout): {username}")
+                return _json(_ERR_BUSY, 503)
+            except Exception:
+                password_valid = False
+            
+            if user and password_valid:
+                if kind == 'django':
+                    migrate_password_hash(user, password)
+                if _LOG_INFO:
+                    logger.info(f"Erfolgreiche Anmeldung: {username}")
+                token, mac = issue_token(user.benutzer)
+                return _json({'success': True, 'message': 'Anmeldung erfolgreich', 'token': token, 'mac': mac})
             
             # Wenn wir hier ankommen, war das Login nicht erfolgreich
             logger.warning(f"Fehlgeschlagene Anmeldung: {username}")
-            return jsonify({'success': False, 'message': 'Ungültige Anmeldedaten'}), 401
+            return _json(_ERR_INVALID_CREDENTIALS, 401)
             
         except Exception as db_error:
             logger.error(f"Datenbankfehler bei Login: {db_error}")
-            return jsonify({'success': False, 'message': f'Datenbankfehler: {str(db_error)}'}), 500
+            return _json({'success': False, 'message': f'Datenbankfehler: {str(db_error)}'}, 500)
     
     except Exception as e:
         logger.error(f"Fehler bei Anmeldung: {e}")
-        return jsonify({'success': False, 'message': 'Interner Serverfehler'}), 500
+        return _json(_ERR_INTERNAL, 500)
 
 # API-Endpunkt: Alle Gruppen abrufen
 @app.route('/groups', methods=['GET'])
+@requires_auth
+@cache.cached(timeout=60, key_prefix=GROUPS_CACHE_KEY, response_filter=_cache_only_success)
 def get_groups():
     """
     Ruft alle Gruppen aus der Datenbank ab.
     
     Returns:
-        JSON: {'success': True, 'groups': [{'id': 1, 'name': 'Gruppe1'}, ...]}
+        JSON: {'success': True, 'groups': [{'id': 1, 'name': 'Gruppe1', 'art': 1}, ...]}
     """
     try:
-        # Alle Gruppen aus der Datenbank laden
-        groups = Group.query.all()
-        groups_list = []
+        # Nur die benötigten Spalten laden (leichte Row-Tupel statt ORM-Objekte)
+        rows = db.session.execute(
+            select(Group.id, Group.name, Group.art).order_by(Group.art, Group.name)
+        ).all()
         
         # Gruppen in JSON-Format konvertieren
-        for group in groups:
-            groups_list.append({
-                'id': group.id,
-                'name': group.name,
-                'art': group.art
-            })
-        return jsonify({'success': True, 'groups': groups_list})
+        groups_list = [{'id': group_id, 'name': name, 'art': art} for group_id, name, art in rows]
+        return _json({'success': True, 'groups': groups_list})
     
     except Exception as e:
         logger.error(f"Fehler beim Laden der Gruppen: {e}")
-        return jsonify({'success': False, 'message': 'Fehler beim Laden der Gruppen'}), 500
+        return _json(_ERR_LOAD_GROUPS, 500)
 
 # API-Endpunkt: Neue Gruppe hinzufügen
 @app.route('/groups', methods=['POST'])
+@requires_auth
 def add_group():
     """
     Fügt eine neue Gruppe zur Datenbank hinzu.
@@ -200,57 +529,133 @@ def add_group():
         
         # Validierung: Name darf nicht leer sein
         if not name:
-            return jsonify({'success': False, 'message': 'Name ist erforderlich'}), 400
+            return _json(_ERR_NAME_REQUIRED, 400)
         
         # Validierung: Art muss 1 oder 2 sein
         if art not in [1, 2]:
-            return jsonify({'success': False, 'message': 'Art muss 1 (Studenten) oder 2 (Auszubildende) sein'}), 400
+            return _json(_ERR_INVALID_ART, 400)
         
         # Neue Gruppe erstellen und in Datenbank speichern
         new_group = Group(name=name, art=art)
         db.session.add(new_group)
         db.session.commit()
+        cache.delete(GROUPS_CACHE_KEY)
         
-        art_text = "Studenten" if art == 1 else "Auszubildende"
-        logger.info(f"Neue Gruppe hinzugefügt: {name} ({art_text})")
-        return jsonify({'success': True, 'message': 'Gruppe hinzugefügt'})
+        if _LOG_INFO:
+            art_text = "Studenten" if art == 1 else "Auszubildende"
+            logger.info(f"Neue Gruppe hinzugefügt: {name} ({art_text})")
+        return _json({'success': True, 'message': 'Gruppe hinzugefügt'})
         
     except Exception as e:
         logger.error(f"Fehler beim Hinzufügen der Gruppe: {e}")
-        return jsonify({'success': False, 'message': 'Fehler beim Hinzufügen'}), 500
+        return _json(_ERR_ADD_GROUP, 500)
+
+# API-Endpunkt: Mehrere Gruppen in einer Transaktion hinzufügen
+BULK_MAX_GROUPS = 500  # Obergrenze für Einträge pro Bulk-Request
+_ERR_TOO_MANY_GROUPS = orjson.dumps({'success': False, 'message': f'Maximal {BULK_MAX_GROUPS} Gruppen pro Anfrage'})
+
+@app.route('/groups/bulk', methods=['POST'])
+@requires_auth
+def add_groups_bulk():
+    """
+    Fügt mehrere Gruppen mit einem einzigen Commit zur Datenbank hinzu.
+    Ist ein Eintrag ungültig, wird keine Gruppe gespeichert.
+
+    Expected JSON: {'groups': [{'name': 'Gruppenname', 'art': 1}, ...]}
+
+    Returns:
+        JSON: {'success': True, 'message': '2 Gruppen hinzugefügt'} oder Fehlermeldung
+    """
+    try:
+        # Gültiges JSON kann auch eine Liste oder ein Skalar sein
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return _json(_ERR_GROUPS_REQUIRED, 400)
+
+        groups = data.get('groups')
+        if not isinstance(groups, list) or not groups:
+            return _json(_ERR_GROUPS_REQUIRED, 400)
+        if len(groups) > BULK_MAX_GROUPS:
+            return _json(_ERR_TOO_MANY_GROUPS, 400)
+
+        # Alle Einträge validieren, bevor etwas geschrieben wird
+        valid_rows = []
+        for index, entry in enumerate(groups):
+            if not isinstance(entry, dict) or not isinstance(entry.get('name'), str) or not entry['name']:
+                return _json({'success': False, 'message': f'Eintrag {index}: Name ist erforderlich'}, 400)
+
+            art = entry.get('art', 1)  # Default: 1 (Studenten)
+            if art not in [1, 2]:
+                return _json({'success': False, 'message': f'Eintrag {index}: Art muss 1 (Studenten) oder 2 (Auszubildende) sein'}, 400)
+
+            valid_rows.append({'name': entry['name'], 'art': art})
+
+        # Ein INSERT-Batch und ein Commit für alle Gruppen
+        db.session.bulk_insert_mappings(Group, valid_rows)
+        db.session.commit()
+        cache.delete(GROUPS_CACHE_KEY)
+
+        if _LOG_INFO:
+            logger.info(f"{len(valid_rows)} Gruppen hinzugefügt (Bulk)")
+        return _json({'success': True, 'message': f'{len(valid_rows)} Gruppen hinzugefügt'})
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Fehler beim Hinzufügen mehrerer Gruppen: {e}")
+        return _json(_ERR_ADD_GROUP, 500)
 
 # API-Endpunkt: Gruppe löschen
 @app.route('/group/<int:group_id>', methods=['DELETE'])
+@requires_auth
 def delete_group(group_id):
     try:
-        # Gruppe anhand der ID in der Datenbank suchen
-        group = Group.query.get_or_404(group_id)
+        # Gruppe direkt per DELETE ... RETURNING löschen (kein vorheriges SELECT)
+        group_name = db.session.execute(
+            delete(Group).where(Group.id == group_id).returning(Group.name)
+        ).scalar()
         
-        # Gruppenname für Log-Meldung speichern
-        group_name = group.name
+        if group_name is None:
+            db.session.rollback()
+            return _json(_ERR_GROUP_NOT_FOUND, 404)
         
-        # Gruppe aus Datenbank löschen
-        db.session.delete(group)
         db.session.commit()
+        cache.delete(GROUPS_CACHE_KEY)
         
-        logger.info(f"Gruppe gelöscht: {group_name} (ID: {group_id})")
-        return jsonify({'success': True, 'message': 'Group erfolgreich gelöscht'})
+        if _LOG_INFO:
+            logger.info(f"Gruppe gelöscht: {group_name} (ID: {group_id})")
+        return _json({'success': True, 'message': 'Group erfolgreich gelöscht'})
         
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Fehler beim Löschen der Gruppe: {e}")
-        return jsonify({'success': False, 'message': 'Fehler beim Löschen der Gruppe'}), 500
-
-# CORS-Unterstützung für OPTIONS-Requests (Preflight-Requests)
-@app.route('/groups', methods=['OPTIONS'])
-@app.route('/group/<int:group_id>', methods=['OPTIONS'])
-@app.route('/api/login', methods=['OPTIONS'])
-def options_handler(group_id=None):
-    return '', 200
-    
+        return _json(_ERR_DELETE_GROUP, 500)
+
+# CLI-Befehl: flask --app api migrate-passwords
+@app.cli.command('migrate-passwords')
+def migrate_passwords_command():
+    """
+    Hasht alle noch im Klartext gespeicherten Passwörter einmalig mit scrypt.
+    Django-Hashes werden beim nächsten erfolgreichen Login migriert.
+    """
+    migrated = 0
+    for user in User.query.all():
+        if _is_password_hash(user.Passwort):
+            continue
+        user.Passwort = generate_password_hash(user.Passwort, method=PASSWORD_HASH_METHOD)
+        migrated += 1
+    db.session.commit()
+    logger.info(f"{migrated} Klartext-Passwörter migriert")
+    click.echo(f"{migrated} Klartext-Passwörter migriert")
+
 # Startet die Flask-Anwendung im Debug-Modus
 if __name__ == '__main__':
     # Keine Tabellen erstellen - nutze existierende Login-Tabelle
     print("Backend startet - nutze existierende Login-Tabelle")
+    ensure_indexes()
+
+    # SIGHUP leert den PBKDF2-Cache (nicht unter Windows verfügbar)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, clear_kdf_cache)
     
     # Debug-Modus für Entwicklung aktivieren (automatisches Neuladen bei Dateiänderungen)
     app.run(debug=True, host='127.0.0.1', port=5000)
\ No newline at end of file
@@ -58,6 +58,47 @@ let benutzer = null;
 // Schutz gegen mehrfache Ausführung von Löschoperationen
 let isDeletingInProgress = false;
 
+/**
+ * Liefert die Header für authentifizierte API-Anfragen
+ *
+ * Das beim Login erhaltene Token wird als "Bearer <token>.<mac>" mitgeschickt
+ */
+function authHeaders() {
+	const token = localStorage.getItem("token");
+	const mac = localStorage.getItem("mac");
+	const headers = {
+		"Content-Type": "application/json",
+	};
+	if (token && mac) {
+		headers["Authorization"] = `Bearer ${token}.${mac}`;
+	}
+	return headers;
+}
+
+/**
+ * Beendet die lokale Sitzung nach einer 401-Antwort der API
+ *
+ * Funktionsweise:
+ * - Entfernt Benutzer und Token aus dem localStorage
+ * - Versteckt die Inhalte und zeigt das Anmeldeformular an
+ * - Auf Seiten ohne Anmeldeformular wird zur Startseite gewechselt
+ */
+function sitzungBeenden() {
+	localStorage.removeItem("benutzer");
+	localStorage.removeItem("token");
+	localStorage.removeItem("mac");
+	benutzer = null;
+
+	window.FamilienApp.hideContent();
+
+	const anmeldenContainer = document.getElementById("anmeldenContainer");
+	if (anmeldenContainer) {
+		anmeldenContainer.style.display = "block";
+	} else {
+		window.location.href = "Index.html";
+	}
+}
+
 /**
  * Lädt alle Gruppen vom Flask-API und aktualisiert UI-Komponenten
  *
@@ -74,9 +115,19 @@ function ladeGruppen() {
 	}
 
 	// API-Anfrage an Flask-Backend
-	return fetch(`${url}/groups`)
-		.then((res) => res.json())
+	return fetch(`${url}/groups`, {
+		headers: authHeaders(),
+	})
+		.then((res) => {
+			// Token fehlt oder ist abgelaufen: neu anmelden
+			if (res.status === 401) {
+				sitzungBeenden();
+				return null;
+			}
+			return res.json();
+		})
 		.then((data) => {
+			if (!data) return;
 			if (data.success && data.groups) {
 				// Konvertierung in Choices.js Format: {value: id, label: name, art: art}
 				const choicesArray = data.groups.map((group) => ({
@@ -177,16 +228,22 @@ function hinzufuegen() {
 		// POST-Request an Flask-API senden
 		fetch(`${url}/groups`, {
 			method: "POST",
-			headers: {
-				"Content-Type": "application/json",
-			},
+			headers: authHeaders(),
 			body: JSON.stringify({
 				name: gruppenname,
 				art: art, // 1 = Studenten, 2 = Auszubildende
 			}), // JSON-Format für Flask-API
 		})
-			.then((response) => response.json())
+			.then((response) => {
+				// Token fehlt oder ist abgelaufen: neu anmelden
+				if (response.status === 401) {
+					sitzungBeenden();
+					return null;
+				}
+				return response.json();
+			})
 			.then((data) => {
+				if (!data) return;
 				if (data.success) {
 					const artText = art === 1 ? "Studenten" : "Auszubildende";
 					console.log(`Neue Gruppe hinzugefügt: ${gruppenname} (${artText})`);
@@ -302,6 +359,7 @@ function loeschen() {
 async function deleteGroupsSequentially(groupsToDelete) {
 	let successCount = 0; // Zähler für erfolgreich gelöschte Gruppen
 	let errorCount = 0; // Zähler für Fehler
+	let sitzungAbgelaufen = false; // 401 von der API: Token fehlt oder ist abgelaufen
 
 	// Sequenzielle Verarbeitung aller zu löschenden Gruppen
 	for (let i = 0; i < groupsToDelete.length; i++) {
@@ -318,11 +376,14 @@ async function deleteGroupsSequentially(groupsToDelete) {
 			// DELETE-Request an Flask-API senden
 			const response = await fetch(`${url}/group/${groupId}`, {
 				method: "DELETE",
-				headers: {
-					"Content-Type": "application/json",
-				},
+				headers: authHeaders(),
 			});
 
+			if (response.status === 401) {
+				sitzungAbgelaufen = true;
+				break; // Weitere Löschversuche wären ebenfalls nicht autorisiert
+			}
+
 			if (response.ok) {
 				successCount++;
 			} else {
@@ -337,12 +398,15 @@ async function deleteGroupsSequentially(groupsToDelete) {
 						`http://localhost:5000/group/${groupId}`,
 						{
 							method: "DELETE",
-							headers: {
-								"Content-Type": "application/json",
-							},
+							headers: authHeaders(),
 						}
 					);
 
+					if (retryResponse.status === 401) {
+						sitzungAbgelaufen = true;
+						break;
+					}
+
 					if (retryResponse.ok) {
 						successCount++;
 					} else {
@@ -360,6 +424,12 @@ async function deleteGroupsSequentially(groupsToDelete) {
 	// Sperre aufheben
 	isDeletingInProgress = false;
 
+	// Bei abgelaufener Sitzung neu anmelden statt Fehlermeldung anzeigen
+	if (sitzungAbgelaufen) {
+		sitzungBeenden();
+		return;
+	}
+
 	// UI aktualisieren
 	if (window.groupChoicesLoeschenInstance && successCount > 0) {
 		// Auswahl bereinigen
@@ -405,6 +475,9 @@ function checkAnmeldung() {
 					// Benutzer im localStorage speichern
 					localStorage.setItem("benutzer", anmeldename);
 					localStorage.setItem("password", "wasser");
+					// Sitzungs-Token für weitere API-Anfragen speichern
+					localStorage.setItem("token", data.token);
+					localStorage.setItem("mac", data.mac);
 
 					// Globale benutzer-Variable aktualisieren
 					if (benutzer != "admin") {
@@ -418,6 +491,9 @@ function checkAnmeldung() {
 
 					// Inhalte anzeigen
 					window.FamilienApp.showContent();
+
+					// Gruppen mit gültigem Token neu laden
+					ladeGruppen();
 				} else {
 					// Login fehlgeschlagen
 					console.error("Login fehlgeschlagen:", data.message);
@@ -630,9 +630,9 @@ document.addEventListener("DOMContentLoaded", () => {
 		window.FamilienApp.hideContent();
 	}
 
-	// Prüfe ob Benutzer eingeloggt ist (localStorage)
-	const benutzer = localStorage.getItem("benutzer");
-	if (benutzer) {
+	// Prüfe ob Benutzer eingeloggt ist: gültige Sitzung nur mit Token (localStorage)
+	const token = localStorage.getItem("token");
+	if (token) {
 		// Content anzeigen
 		if (
 			window.FamilienApp &&